@@ -2,6 +2,8 @@
 import os
 import json
 import re
+import argparse
+import hashlib
 
 def extract_hg_id(filename):
     """Extract the HG ID from the filename."""
@@ -22,32 +24,103 @@ def extract_id_from_filename(file_name):
     hg_id = extract_hg_id(file_name)
     return sample_id, ref_id, hg_id
 
+def cramino_section(header):
+    """
+    Map a cramino '#' section header to the section it starts (karyotype, histogram, phasing or key-value).
+    """
+    header = header.lstrip("#").strip().lower()
+    if "per chromosome" in header or "karyotype" in header:
+        return "karyotype", None
+    # Histogram headers come first: '# Histogram for phaseblock lengths' is a histogram, not the phasing section
+    if "histogram" in header:
+        name = header.split(" for ", 1)[-1].rstrip(":").strip()
+        return "histogram", name.replace(" ", "_")
+    if "phas" in header:
+        return "phasing", None
+    return "summary", None
+
+def parse_histogram_line(line):
+    """
+    Parse a cramino histogram row such as '0-2500 ∎∎∎∎ 1234' into (bin start, bin end, count, bar length).
+    Each bound is scaled by its own k/M suffix ('500-1k') and label prefixes such as 'Q10-Q11' are ignored.
+    The count is None when cramino only prints the bar, which is scaled to the largest bin.
+    """
+    match = re.match(r'\s*[A-Za-z]*([\d.]+)([kKmM]?)\s*-\s*[A-Za-z]*([\d.]+)([kKmM]?)\S*\s*(.*)$', line)
+    if not match:
+        return None
+    scale = {"k": 1e3, "m": 1e6}
+    start = float(match.group(1)) * scale.get(match.group(2).lower(), 1)
+    end = float(match.group(3)) * scale.get(match.group(4).lower(), 1)
+    rest = match.group(5).strip()
+    count = re.search(r'(\d+)$', rest)
+    bar = rest[:count.start()] if count else rest
+    return (start, end, int(count.group(1)) if count else None, len(bar.replace(" ", "")))
+
 def cramino(file_path):
     """
-    Parse the first 13 lines of cramino.txt output with tab-separated key-value pairs,
-    including ref_id and hg_id if present.
+    Parse the full cramino.txt output in a single pass, including ref_id and hg_id if present.
+    Tab-separated key-value pairs of the summary are stored as is, those of the phasing
+    section under "phasing", the --karyotype section as parallel chromosome/normalized
+    coverage arrays and each --hist section as parallel bin_start/bin_end/count/bar_length
+    arrays. bar_length is the number of bar characters (relative to the largest bin, not a
+    read count); count holds the read count only when cramino prints it, otherwise None.
     """
     cramino_data = {}
+    phasing = {}
+    chromosomes, normalized_coverage = [], []
+    histograms = {}
+    section, histogram_name = "summary", None
     extracted_sample_id, extracted_ref_id, extracted_hg_id = extract_id_from_filename(file_path)
     ref_id = extracted_ref_id
     hg_id = extracted_hg_id
     
     with open(file_path, 'r') as file:
-        for idx, line in enumerate(file):
-            if idx >= 13:  # Stop reading after 13 lines
-                break
-            parts = line.strip().split('\t')
-            if len(parts) == 2:  # Ensure it's a valid key-value pair
-                key, value = parts
-                key = key.strip()
-                value = value.strip()
-                cramino_data[key] = value
-                
-                # Capture ref_id and hg_id if they appear in the data
-                if key.lower() == "ref_id" and value != "Unknown":
-                    ref_id = value
-                if key.lower() == "hg_id" and value != "Unknown":
-                    hg_id = value
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("#"):
+                section, histogram_name = cramino_section(line)
+                continue
+
+            if section == "histogram":
+                row = parse_histogram_line(line)
+                if row is None:
+                    print(f"Warning: skipped unrecognised {histogram_name} histogram row in {file_path}: {line}")
+                else:
+                    histogram = histograms.setdefault(histogram_name, {"bin_start": [], "bin_end": [], "count": [], "bar_length": []})
+                    for key, value in zip(("bin_start", "bin_end", "count", "bar_length"), row):
+                        histogram[key].append(value)
+                continue
+
+            parts = line.split('\t')
+            if len(parts) != 2:  # Ensure it's a valid key-value pair
+                continue
+            key, value = parts[0].strip(), parts[1].strip()
+            if section == "karyotype":
+                try:
+                    normalized_coverage.append(float(value))
+                    chromosomes.append(key)
+                except ValueError:
+                    pass
+                continue
+            if section == "phasing":
+                phasing[key] = value
+                continue
+
+            cramino_data[key] = value
+            # Capture ref_id and hg_id if they appear in the data
+            if key.lower() == "ref_id" and value != "Unknown":
+                ref_id = value
+            if key.lower() == "hg_id" and value != "Unknown":
+                hg_id = value
+
+    if chromosomes:
+        cramino_data["karyotype"] = {"chromosomes": chromosomes, "normalized_coverage": normalized_coverage}
+    if phasing:
+        cramino_data["phasing"] = phasing
+    if histograms:
+        cramino_data["histograms"] = histograms
     
     return extracted_sample_id, cramino_data, ref_id, hg_id
 
@@ -77,14 +150,83 @@ def samtools_stats(file_path):
         print(f"Error: File not found {file_path}")
     return samtools_data
 
-def combine_multiple_files(cramino_files, samtools_files, output_json):
+def parse_shard(spec):
+    """
+    Parse a shard spec 'i/N' (0-based shard index i out of N shards); used as an argparse type.
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard '{spec}': expected i/N, e.g. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"invalid shard '{spec}': expected i/N with 0 <= i < N")
+    return index, count
+
+# First line of every shard file, recording which shard of how many it holds
+SHARD_HEADER_KEY = "__shard__"
+
+def check_shard_set(headers):
     """
-    Combine multiple cramino.txt and samtools_stats.txt files into a single JSON file.
+    Check that shard headers [(index, count), ...] cover every index 0..N-1 exactly once for a single N.
+    """
+    counts = {count for _, count in headers}
+    if len(counts) != 1:
+        raise ValueError(f"Shards were built with different shard counts: {sorted(counts)}")
+    count = counts.pop()
+    indices = sorted(index for index, _ in headers)
+    duplicated = sorted({index for index in indices if indices.count(index) > 1})
+    missing = sorted(set(range(count)) - set(indices))
+    if duplicated or missing:
+        raise ValueError(f"Incomplete shard set for {count} shards: missing {missing}, duplicated {duplicated}")
+
+def in_shard(file_stem, shard):
+    """
+    Check whether a file stem belongs to the given (index, count) shard.
+    A stable hash (not Python's salted hash()) keeps shards disjoint across nodes.
+    """
+    if shard is None:
+        return True
+    index, count = shard
+    return int(hashlib.md5(file_stem.encode()).hexdigest(), 16) % count == index
+
+def merge_shards(shard_files, output_json):
+    """
+    Merge a complete set of JSONL shards into the same sorted JSON file a single-process run would write.
+    """
+    combined_data = {}
+    headers = []
+    for shard_file in shard_files:
+        with open(shard_file, 'r') as file:
+            header = json.loads(file.readline() or "{}")
+            if SHARD_HEADER_KEY not in header:
+                raise ValueError(f"{shard_file} has no shard header line")
+            headers.append(tuple(header[SHARD_HEADER_KEY]))
+            for line in file:
+                if not line.strip():
+                    continue
+                for sample_id, value in json.loads(line).items():
+                    if sample_id in combined_data and combined_data[sample_id] != value:
+                        raise ValueError(f"Conflicting entries for {sample_id} in {shard_file}")
+                    combined_data[sample_id] = value
+    check_shard_set(headers)
+
+    with open(output_json, 'w') as json_file:
+        json.dump(dict(sorted(combined_data.items())), json_file, indent=4)
+    print(f"Data from {len(shard_files)} shards merged and written to {output_json}")
+
+def combine_multiple_files(cramino_files, samtools_files, output_json, shard=None):
+    """
+    Combine multiple cramino.txt and samtools_stats.txt files into a single JSON file, sorted by sample ID.
+    With a (index, count) shard only that shard's samples are parsed and written as JSONL,
+    a shard header line followed by one {sample_id: data} object per line, to be combined
+    later with merge_shards().
     """
     combined_data = {}
 
     for cramino_file, samtools_file in zip(cramino_files, samtools_files):
         sample_id, extracted_ref_id, extracted_hg_id = extract_id_from_filename(cramino_file)
+        if not in_shard(sample_id, shard):
+            continue
         samtools_file_name = os.path.basename(samtools_file)
         
         extracted_sample_id, cramino_data, file_ref_id, file_hg_id = cramino(cramino_file)
@@ -108,11 +250,23 @@ def combine_multiple_files(cramino_files, samtools_files, output_json):
             }
         })
 
+    combined_data = dict(sorted(combined_data.items()))
     with open(output_json, 'w') as json_file:
-        json.dump(combined_data, json_file, indent=4)
-    print(f"Data from {len(cramino_files)} file pairs combined and written to {output_json}")
+        if shard:
+            json_file.write(json.dumps({SHARD_HEADER_KEY: list(shard)}) + "\n")
+            for sample_id, value in combined_data.items():
+                json_file.write(json.dumps({sample_id: value}) + "\n")
+        else:
+            json.dump(combined_data, json_file, indent=4)
+    print(f"Data from {len(combined_data)} samples combined and written to {output_json}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Combine cramino and samtools stats outputs into output.json.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--shard", type=parse_shard, help="Only process shard i/N (0-based) and write a partial output.shard-i-of-N.jsonl")
+    mode.add_argument("--merge", nargs="+", metavar="SHARD", help="Merge a complete set of shard JSONL files into output.json")
+    args = parser.parse_args()
+
     # Specify file paths for cramino.txt and samtools_stats.txt
     cramino_files = [
         "HG008-T_GRCh38-GIABv3_ONT-UL-R10.4.1-dorado_0.8.1_sup.5mC_5hmC_54x_20241216.cramino.txt",
@@ -127,7 +281,13 @@ def main():
         raise ValueError("Mismatched number of cramino and samtools files.")
 
     output_json_path = 'output.json'
-    combine_multiple_files(cramino_files, samtools_files, output_json_path)
+    if args.merge:
+        merge_shards(args.merge, output_json_path)
+    elif args.shard:
+        shard = args.shard
+        combine_multiple_files(cramino_files, samtools_files, f"output.shard-{shard[0]}-of-{shard[1]}.jsonl", shard)
+    else:
+        combine_multiple_files(cramino_files, samtools_files, output_json_path)
 
 if __name__ == "__main__":
     main()
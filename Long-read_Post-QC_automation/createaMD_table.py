@@ -123,6 +123,27 @@ def create_markdown_table(hg_id, entries, mosdepth_file):
     ) + " |" for row in data_rows]
     return f"### hg_id: {hg_id}\n\n" + "\n".join(table) + "\n"
 
+def create_karyotype_table(hg_id, entries):
+    """Creates a per-chromosome copy-ratio table from the cramino --karyotype normalized coverage."""
+    ordered_entries = reorder_entries_by_ref(entries)
+    karyotypes = [entry.get("cramino", {}).get("karyotype", {}) for entry in ordered_entries]
+    if not any(karyotypes):
+        return ""
+
+    ratios = [dict(zip(k.get("chromosomes", []), k.get("normalized_coverage", []))) for k in karyotypes]
+    chromosomes = []
+    for karyotype in karyotypes:
+        chromosomes += [chrom for chrom in karyotype.get("chromosomes", []) if chrom not in chromosomes]
+
+    header_row = ["Chromosome"] + [entry.get('ref_id', 'Missing_ref_id') for entry in ordered_entries]
+    data_rows = [[chrom] + [f"{ratio[chrom]:.2f}" if chrom in ratio else "NA" for ratio in ratios] for chrom in chromosomes]
+
+    all_rows = [header_row] + data_rows
+    col_widths = [max(len(row[i]) for row in all_rows) for i in range(len(header_row))]
+    table = ["| " + " | ".join(cell.ljust(col_widths[i]) for i, cell in enumerate(row)) + " |" for row in all_rows]
+    table.insert(1, "| " + " | ".join("-" * col_widths[i] for i in range(len(header_row))) + " |")
+    return f"#### hg_id: {hg_id} per-chromosome copy ratio (cramino normalized coverage)\n\n" + "\n".join(table) + "\n"
+
 def load_json(filename):
     if not os.path.exists(filename):
         print(f"Error: JSON file '{filename}' not found.")
@@ -146,6 +167,7 @@ def load_json(filename):
 def main():
     json_file = "output.json"
     mosdepth_file = "HG008-T_Element_GRCh38-GIABv3.txt"  # Change this to the correct path
+    include_karyotype = False  # Set to True to add the per-chromosome copy-ratio table (needs cramino --karyotype)
 
     data = load_json(json_file)
     if not data:
@@ -158,7 +180,12 @@ def main():
 
     markdown_content = "# Combined Metrics Tables\n\n"
     for hg_id, entries in groups.items():
-        markdown_content += create_markdown_table(hg_id, entries, mosdepth_file) + "\n---\n\n"
+        markdown_content += create_markdown_table(hg_id, entries, mosdepth_file) + "\n"
+        if include_karyotype:
+            karyotype_table = create_karyotype_table(hg_id, entries)
+            if karyotype_table:
+                markdown_content += karyotype_table + "\n"
+        markdown_content += "---\n\n"
 
     with open("output.md", "w") as f:
         f.write(markdown_content)
@@ -1,6 +1,13 @@
 ## This python script can be used to rename the Alignments and QC metrics files for consistency and FTP staging
 
 import os
+import shutil
+import fcntl
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# ioctl request used by Linux filesystems with copy-on-write support (btrfs, XFS) to clone a file
+FICLONE = 0x40049409
 
 # Function to rename files
 def rename_files(directory, old_pattern, new_pattern):
@@ -19,6 +26,68 @@ def rename_files(directory, old_pattern, new_pattern):
             os.rename(old_file, new_file)
             print(f'Renamed: {filename} -> {new_filename}')
             
+# Function to link one file into the staging tree, falling back to a copy
+def link_file(source, target, link_mode):
+    # Never unlink a target that resolves (directly or through a symlink) to a file in the source directory
+    source_dir = os.path.dirname(os.path.realpath(source))
+    if os.path.dirname(os.path.realpath(target)) == source_dir:
+        raise ValueError(f"Refusing to replace {target}: it resolves into the source directory {source_dir}")
+    try:
+        os.remove(target)
+    except FileNotFoundError:
+        pass
+    try:
+        if link_mode == "hardlink":
+            os.link(source, target)
+        elif link_mode == "reflink":
+            with open(source, 'rb') as src, open(target, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        else:
+            raise ValueError(f"Unknown link mode: {link_mode}")
+        return link_mode
+    except OSError:
+        # Cross-device links or filesystems without reflink support end up here
+        if os.path.exists(target):
+            os.remove(target)
+        shutil.copy2(source, target)
+        return "copy"
+
+# Function to build the FTP staging tree from naming rules without touching the source files
+# Each rule is (old_pattern, new_pattern, subdirectory); the first matching rule wins
+def stage_files(directory, staging_directory, rules, link_mode="hardlink", workers=8):
+    # A staging tree inside the source directory (or containing it) could overwrite source files
+    source_real = os.path.realpath(directory)
+    staging_real = os.path.realpath(staging_directory)
+    if os.path.commonpath([source_real, staging_real]) in (source_real, staging_real):
+        raise ValueError(f"Staging directory {staging_directory} overlaps the source directory {directory}")
+
+    jobs = []
+    for filename in sorted(os.listdir(directory)):
+        source = os.path.join(directory, filename)
+        if not os.path.isfile(source):
+            continue
+        for old_pattern, new_pattern, subdirectory in rules:
+            if old_pattern in filename:
+                new_filename = filename.replace(old_pattern, new_pattern)
+                jobs.append((source, os.path.join(staging_directory, subdirectory, new_filename)))
+                break
+
+    # Two source files renamed to the same staged path would overwrite each other
+    targets = Counter(target for _, target in jobs)
+    duplicates = sorted(target for target, count in targets.items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Multiple source files map to the same staged path: {', '.join(duplicates)}")
+
+    for target_dir in sorted({os.path.dirname(target) for _, target in jobs}):
+        os.makedirs(target_dir, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        modes = list(executor.map(lambda job: link_file(job[0], job[1], link_mode), jobs))
+
+    for (source, target), mode in zip(jobs, modes):
+        print(f'Staged ({mode}): {os.path.basename(source)} -> {os.path.relpath(target, staging_directory)}')
+    return dict(zip((target for _, target in jobs), modes))
+
 # Example usage:
 # Specify the directory containing your files
 directory = 'PATH'
@@ -27,5 +96,15 @@ directory = 'PATH'
 old_pattern = 'GRCh38-GIABv3_HG005_GAT-APP-C144'
 new_pattern = 'HG005_Element-StdInsert_78x_GRCh38-GIABv3'
 
-# Call the rename function
-rename_files(directory, old_pattern, new_pattern)
+# Specify a staging directory to build the FTP layout with hard links ("hardlink") or reflinks ("reflink")
+# instead of renaming in place; leave as None to rename the files in the directory
+staging_directory = None
+link_mode = "hardlink"
+
+if staging_directory:
+    # Rules are (old_pattern, new_pattern, subdirectory inside the staging directory)
+    staging_rules = [(old_pattern, new_pattern, "")]
+    stage_files(directory, staging_directory, staging_rules, link_mode)
+else:
+    # Call the rename function
+    rename_files(directory, old_pattern, new_pattern)
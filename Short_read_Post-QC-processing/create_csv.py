@@ -19,6 +19,20 @@ samtools_metrics = {
     "percentage of properly paired reads (%)": "Percentage of properly paired",
 }
 
+# GC-bias and per-cycle quality summaries derived from the samtools stats GCD/GCC/FFQ/LFQ sections
+samtools_qc_metrics = {
+    "gc depth slope": "GC depth slope",
+    "at dropout": "AT dropout",
+    "gc dropout": "GC dropout",
+    "gc per-cycle max deviation": "GC per-cycle max deviation",
+    "first fragment mean quality": "First fragment mean Q",
+    "first fragment min cycle mean quality": "First fragment min cycle mean Q",
+    "first fragment quality drop cycle": "First fragment Q drop cycle",
+    "last fragment mean quality": "Last fragment mean Q",
+    "last fragment min cycle mean quality": "Last fragment min cycle mean Q",
+    "last fragment quality drop cycle": "Last fragment Q drop cycle",
+}
+
 mosdepth_metrics = {
   "mean_autosome_coverage": "Mean_autosome_coverage",
 }
@@ -71,7 +85,7 @@ def format_value(metric_key, display_name, raw_value):
 
 def create_csv_table(entries, mosdepth_values):
     ordered_entries = reorder_entries(entries)
-    header_row = ["HG_ID", "Ref_ID"] + list(samtools_metrics.values()) + ["mean_autosome_coverage","percent_mapped_reads" ,"diploid_mean_coverage", "haploid_mean_coverage","tumor_ploidy_short","NRPCC"]
+    header_row = ["HG_ID", "Ref_ID"] + list(samtools_metrics.values()) + ["mean_autosome_coverage","percent_mapped_reads" ,"diploid_mean_coverage", "haploid_mean_coverage","tumor_ploidy_short","NRPCC"] + list(samtools_qc_metrics.values())
     data_rows = []
     
     for entry in ordered_entries:
@@ -119,6 +133,9 @@ def create_csv_table(entries, mosdepth_values):
             row.append("NA")
             row.append("NA")
             row.append("NA")
+
+        for metric_key, display_name in samtools_qc_metrics.items():
+            row.append(format_value(metric_key, display_name, entry.get("samtools", {}).get(metric_key, '-')))
         data_rows.append(row)
     
     return [header_row] + data_rows
@@ -0,0 +1,171 @@
+## This script flags QC outliers across all samples in metrics.json using robust z-scores (median/MAD) and percentile ranks within each platform and reference group. It writes the flagged metrics as a CSV and a markdown section next to output.csv/output.md
+
+import json
+import csv
+import re
+import warnings
+from collections import defaultdict
+import numpy as np
+
+# Robust z-score above which a metric is flagged (Iglewicz and Hoaglin modified z-score cut-off)
+ROBUST_Z_THRESHOLD = 3.5
+
+# Smallest platform/reference group in which outliers are meaningful
+MIN_GROUP_SIZE = 3
+
+# Scale factors that make MAD and mean absolute deviation consistent with the standard deviation
+MAD_SCALE = 1.4826
+MEAN_AD_SCALE = 1.2533
+
+# Metrics scored for outliers: library quality ratios and summaries from samtools stats.
+# Flags, constants, values that track sequencing depth (reads mapped, mean coverage) and
+# cycle indices (quality drop cycle, NA when there is no drop) are left out.
+outlier_metrics = [
+    "error rate",
+    "average length",
+    "insert size average",
+    "insert size standard deviation",
+    "percentage of properly paired reads (%)",
+    "percent_mapped_reads",
+    "gc depth slope",
+    "at dropout",
+    "gc dropout",
+    "gc per-cycle max deviation",
+    "first fragment mean quality",
+    "first fragment min cycle mean quality",
+    "last fragment mean quality",
+    "last fragment min cycle mean quality",
+]
+
+# Define the fixed order for ref_id groups.
+FIXED_REF_ORDER = ["GRCh38-GIABv3", "GRCh37", "CHM13v2.0"]
+
+def extract_platform_id(filename):
+    """Extract the sequencing platform from the filename (e.g., Element, Illumina)."""
+    match = re.search(r'(Element|Illumina|BGI|MGI|Ultima|ONT|PacBio)', filename)
+    return match.group(0) if match else "Unknown"
+
+def load_metrics(filename):
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+def to_float(raw_value):
+    try:
+        return float(str(raw_value).split("#")[0].replace(",", "").strip())
+    except ValueError:
+        return np.nan
+
+def format_number(value):
+    """Write a value at full precision, without a trailing .0 for counts."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def format_rounded(value):
+    """Round a value for the markdown table, keeping counts whole with thousands separators."""
+    value = float(value)
+    return f"{int(value):,}" if value.is_integer() else f"{value:.4g}"
+
+def numeric_metrics(entry):
+    """Collect the numeric samtools/mosdepth outlier metrics of one entry, plus percent mapped reads."""
+    values = {}
+    for tool in ("samtools", "mosdepth"):
+        for key, raw_value in entry.get(tool, {}).items():
+            value = to_float(raw_value)
+            if not np.isnan(value):
+                values[key] = value
+    reads = values.get("reads mapped", np.nan)
+    total_raw = values.get("raw total sequences", np.nan)
+    values["percent_mapped_reads"] = reads / total_raw * 100 if total_raw > 0 else np.nan
+    return {key: values[key] for key in outlier_metrics if key in values}
+
+def build_matrix(metrics):
+    """Load all samples into a samples x metrics matrix (NaN where a metric is missing)."""
+    samples = list(metrics.keys())
+    rows = [numeric_metrics(metrics[sample]) for sample in samples]
+    metric_names = [key for key in outlier_metrics if any(key in row for row in rows)]
+    matrix = np.array([[row.get(key, np.nan) for key in metric_names] for row in rows], dtype=float).reshape(len(samples), len(metric_names))
+    return samples, metric_names, matrix
+
+def robust_scores(matrix):
+    """Compute robust z-scores and percentile ranks for every column of a group matrix in one pass."""
+    # Metrics missing for a whole group (e.g. metrics.json built before the GC/quality columns) stay NaN quietly
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(matrix, axis=0)
+        deviation = np.abs(matrix - median)
+        spread = np.nanmedian(deviation, axis=0) * MAD_SCALE
+        # Fall back to the mean absolute deviation where more than half the samples share the median
+        spread = np.where(spread > 0, spread, np.nanmean(deviation, axis=0) * MEAN_AD_SCALE)
+        robust_z = np.where(spread > 0, (matrix - median) / spread, 0.0)
+
+        # Percentile rank: share of samples below plus half of the ties, ignoring missing values
+        below = (matrix[None, :, :] < matrix[:, None, :]).sum(axis=1)
+        ties = (matrix[None, :, :] == matrix[:, None, :]).sum(axis=1)
+        counts = (~np.isnan(matrix)).sum(axis=0)
+        percentile = (below + 0.5 * ties) / counts * 100
+    robust_z[np.isnan(matrix)] = np.nan
+    percentile[np.isnan(matrix)] = np.nan
+    return median, spread, robust_z, percentile
+
+def find_outliers(metrics):
+    """Flag metrics whose robust z-score exceeds the threshold within their platform/reference group."""
+    samples, metric_names, matrix = build_matrix(metrics)
+    groups = defaultdict(list)
+    for i, sample in enumerate(samples):
+        groups[(extract_platform_id(sample), metrics[sample].get("ref_id") or "Unknown")].append(i)
+
+    ordered_groups = sorted(groups.items(), key=lambda item: (item[0][0], FIXED_REF_ORDER.index(item[0][1]) if item[0][1] in FIXED_REF_ORDER else len(FIXED_REF_ORDER)))
+    outliers = []
+    for (platform, ref_id), indices in ordered_groups:
+        if len(indices) < MIN_GROUP_SIZE:
+            print(f"Skipping {platform}/{ref_id}: only {len(indices)} samples.")
+            continue
+        group = matrix[indices]
+        median, spread, robust_z, percentile = robust_scores(group)
+        flagged_rows, flagged_cols = np.nonzero(np.abs(np.nan_to_num(robust_z)) > ROBUST_Z_THRESHOLD)
+        for r, c in zip(flagged_rows, flagged_cols):
+            sample = samples[indices[r]]
+            outliers.append({
+                "HG_ID": metrics[sample].get("HG_ID", "Unknown"),
+                "Ref_ID": ref_id,
+                "Platform": platform,
+                "Sample": sample,
+                "Metric": metric_names[c],
+                "Value": format_number(group[r, c]),
+                "Group_median": format_number(median[c]),
+                "Robust_z": f"{robust_z[r, c]:.2f}",
+                "Percentile_rank": f"{percentile[r, c]:.1f}",
+                "Group_size": str(len(indices)),
+            })
+    return outliers
+
+def create_outlier_markdown(outliers):
+    header_row = ["HG_ID", "Ref_ID", "Platform", "Sample", "Metric", "Value", "Group_median", "Robust_z", "Percentile_rank"]
+    if not outliers:
+        return "# QC Outliers\n\nNo metrics exceed the robust z-score threshold.\n"
+    rounded = ("Value", "Group_median")
+    all_rows = [header_row] + [[format_rounded(outlier[key]) if key in rounded else outlier[key] for key in header_row] for outlier in outliers]
+    num_cols = len(header_row)
+    col_widths = [max(len(str(row[i])) for row in all_rows) for i in range(num_cols)]
+    lines = []
+    lines.append("| " + " | ".join(cell.ljust(col_widths[i]) for i, cell in enumerate(header_row)) + " |")
+    lines.append("| " + " | ".join("-" * col_widths[i] for i in range(num_cols)) + " |")
+    for row in all_rows[1:]:
+        lines.append("| " + " | ".join(row[i].ljust(col_widths[i]) for i in range(num_cols)) + " |")
+    return f"# QC Outliers\n\nRobust z-score (median/MAD) above {ROBUST_Z_THRESHOLD} within each platform and reference group.\n\n" + "\n".join(lines) + "\n"
+
+def main():
+    json_file = "metrics.json"
+    output_csv = "outliers.csv"
+    output_md = "outliers.md"
+    outliers = find_outliers(load_metrics(json_file))
+
+    with open(output_csv, "w", newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=["HG_ID", "Ref_ID", "Platform", "Sample", "Metric", "Value", "Group_median", "Robust_z", "Percentile_rank", "Group_size"])
+        writer.writeheader()
+        writer.writerows(outliers)
+    with open(output_md, "w") as f:
+        f.write(create_outlier_markdown(outliers))
+    print(f"{len(outliers)} outlier metrics written to {output_csv} and {output_md}.")
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,73 @@ import os
 import csv
 import json
 import re
+import argparse
+import hashlib
+import numpy as np
+
+# samtools stats sections collected as numeric tables alongside the SN summary numbers
+STATS_TABLE_SECTIONS = ("GCD", "GCC", "FFQ", "LFQ")
+
+# A cycle counts as a quality drop once its mean Q falls this far below the median cycle
+QUALITY_DROP_THRESHOLD = 5.0
+
+def gc_bias_metrics(gcd):
+    """Reduce the GCD table (GC%, cumulative window percentile, depth percentiles) to GC-bias metrics."""
+    if gcd.ndim != 2 or gcd.shape[0] < 2 or gcd.shape[1] < 5:
+        return {}
+    gc = gcd[:, 0]
+    window_frac = np.diff(gcd[:, 1], prepend=0.0).clip(min=0)
+    depth = gcd[:, 4]  # 50th depth percentile
+    if window_frac.sum() == 0 or depth.max() == 0:
+        return {}
+    window_frac = window_frac / window_frac.sum()
+    read_frac = window_frac * depth
+    read_frac = read_frac / read_frac.sum()
+    norm_depth = depth / np.median(depth[depth > 0])
+
+    # Picard-style dropout: window share not matched by read share, on either side of 50% GC
+    shortfall = (window_frac - read_frac).clip(min=0) * 100
+    metrics = {
+        "at dropout": f"{shortfall[gc <= 50].sum():.4f}",
+        "gc dropout": f"{shortfall[gc >= 50].sum():.4f}",
+    }
+    covered = depth > 0
+    if covered.sum() >= 2:
+        slope = np.polyfit(gc[covered], norm_depth[covered], 1, w=np.sqrt(window_frac[covered]))[0]
+        metrics["gc depth slope"] = f"{slope:.6f}"
+    return metrics
+
+def gc_cycle_metrics(gcc):
+    """Reduce the GCC table (cycle, A, C, G, T, ...) to the largest per-cycle GC deviation."""
+    if gcc.ndim != 2 or gcc.shape[0] == 0 or gcc.shape[1] < 5:
+        return {}
+    gc_per_cycle = gcc[:, 2] + gcc[:, 3]
+    return {"gc per-cycle max deviation": f"{np.abs(gc_per_cycle - gc_per_cycle.mean()).max():.4f}"}
+
+def cycle_quality_metrics(quality, label):
+    """Reduce an FFQ/LFQ table (cycle, counts per quality value) to mean Q summaries by cycle."""
+    if quality.ndim != 2 or quality.shape[0] == 0 or quality.shape[1] < 2:
+        return {}
+    cycles = quality[:, 0].astype(int)
+    counts = quality[:, 1:]
+    totals = counts.sum(axis=1)
+    keep = totals > 0
+    if not keep.any():
+        return {}
+    cycles, counts, totals = cycles[keep], counts[keep], totals[keep]
+    q_values = np.arange(counts.shape[1])
+    mean_q = counts @ q_values / totals
+    dropped = np.flatnonzero(mean_q < np.median(mean_q) - QUALITY_DROP_THRESHOLD)
+    return {
+        f"{label} mean quality": f"{(counts.sum(axis=0) @ q_values) / totals.sum():.2f}",
+        f"{label} min cycle mean quality": f"{mean_q.min():.2f}",
+        f"{label} quality drop cycle": str(cycles[dropped[0]]) if dropped.size else "NA",
+    }
 
 def parse_samtools_stats_file(stats_file):
-    """Parse an existing samtools stats file to extract key metrics."""
+    """Parse an existing samtools stats file to extract key metrics, including GC-bias and per-cycle quality summaries."""
     metrics = {}
+    tables = {section: [] for section in STATS_TABLE_SECTIONS}
     with open(stats_file, 'r') as f:
         for line in f:
             if line.startswith("SN"):  # SN: Summary Numbers in samtools stats
@@ -13,6 +76,21 @@ def parse_samtools_stats_file(stats_file):
                 key = parts[1].strip(":")
                 value = parts[2].strip()
                 metrics[key] = value
+            else:
+                section = line[:3]
+                if section in tables:
+                    tables[section].append(line.rstrip("\n").split("\t")[1:])
+
+    # Rows of a section may differ in length (e.g. FFQ per read length), so pad them before building arrays
+    arrays = {}
+    for section, rows in tables.items():
+        width = max((len(row) for row in rows), default=0)
+        arrays[section] = np.array([[float(v) for v in row] + [0.0] * (width - len(row)) for row in rows]).reshape(len(rows), width)
+
+    metrics.update(gc_bias_metrics(arrays["GCD"]))
+    metrics.update(gc_cycle_metrics(arrays["GCC"]))
+    metrics.update(cycle_quality_metrics(arrays["FFQ"], "first fragment"))
+    metrics.update(cycle_quality_metrics(arrays["LFQ"], "last fragment"))
     return metrics
 
 def parse_mosdepth_csv(csv_file):
@@ -45,27 +123,94 @@ def extract_ref_id(filename):
     match = re.search(r'(GRCh38-GIABv3|GRCh37|CHM13v2.0)', filename)
     return match.group(0) if match else None
 
-def process_files_in_directory(samtools_dir, mosdepth_dir):
-    """Process multiple samtools stats and mosdepth CSV files from given directories."""
+def parse_shard(spec):
+    """Parse a shard spec 'i/N' (0-based shard index i out of N shards); used as an argparse type."""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard '{spec}': expected i/N, e.g. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"invalid shard '{spec}': expected i/N with 0 <= i < N")
+    return index, count
+
+# First line of every shard file, recording which shard of how many it holds
+SHARD_HEADER_KEY = "__shard__"
+
+def check_shard_set(headers):
+    """Check that shard headers [(index, count), ...] cover every index 0..N-1 exactly once for a single N."""
+    counts = {count for _, count in headers}
+    if len(counts) != 1:
+        raise ValueError(f"Shards were built with different shard counts: {sorted(counts)}.")
+    count = counts.pop()
+    indices = sorted(index for index, _ in headers)
+    duplicated = sorted({index for index in indices if indices.count(index) > 1})
+    missing = sorted(set(range(count)) - set(indices))
+    if duplicated or missing:
+        raise ValueError(f"Incomplete shard set for {count} shards: missing {missing}, duplicated {duplicated}.")
+
+def in_shard(file_stem, shard):
+    """Check whether a file stem belongs to the given (index, count) shard; a stable hash keeps shards disjoint across nodes."""
+    if shard is None:
+        return True
+    index, count = shard
+    return int(hashlib.md5(file_stem.encode()).hexdigest(), 16) % count == index
+
+def sort_metrics(all_metrics):
+    """Sort metrics by HG_ID, then by file stem, so any run over the same files gives the same order."""
+    return dict(sorted(all_metrics.items(), key=lambda item: (item[1]["HG_ID"], item[0])))
+
+def write_shard(data, shard_file, shard):
+    """Write a partial result as JSONL: a shard header line, then one {file stem: metrics} object per line."""
+    with open(shard_file, "w") as f:
+        f.write(json.dumps({SHARD_HEADER_KEY: list(shard)}) + "\n")
+        for key, value in data.items():
+            f.write(json.dumps({key: value}) + "\n")
+
+def merge_shards(shard_files):
+    """Merge a complete set of JSONL shards into the metrics a single-process run would produce."""
+    all_metrics = {}
+    headers = []
+    for shard_file in shard_files:
+        with open(shard_file, "r") as f:
+            header = json.loads(f.readline() or "{}")
+            if SHARD_HEADER_KEY not in header:
+                raise ValueError(f"{shard_file} has no shard header line.")
+            headers.append(tuple(header[SHARD_HEADER_KEY]))
+            for line in f:
+                if not line.strip():
+                    continue
+                for key, value in json.loads(line).items():
+                    if key in all_metrics and all_metrics[key] != value:
+                        raise ValueError(f"Conflicting entries for {key} in {shard_file}.")
+                    all_metrics[key] = value
+    check_shard_set(headers)
+    return sort_metrics(all_metrics)
+
+def process_files_in_directory(samtools_dir, mosdepth_dir, shard=None):
+    """Process multiple samtools stats and mosdepth CSV files from given directories, optionally only one (index, count) shard."""
     all_metrics = {}
 
     # Process all samtools stats files
-    for filename in os.listdir(samtools_dir):
+    for filename in sorted(os.listdir(samtools_dir)):
         if filename.endswith("_stats.txt"):  # Assuming samtools stats files are .txt
+            base_filename = filename.replace("_stats.txt", "")  # Remove the suffix to get the base filename
+            if not in_shard(base_filename, shard):
+                continue
             filepath = os.path.join(samtools_dir, filename)
             samtools_metrics = parse_samtools_stats_file(filepath)
-            base_filename = filename.replace("_stats.txt", "")  # Remove the suffix to get the base filename
             hg_id = extract_hg_id(base_filename)  # Extract HG ID for sorting
             ref_id = extract_ref_id(base_filename)  # Extract ref ID
             if hg_id:
                 all_metrics[base_filename] = {"HG_ID": hg_id, "ref_id": ref_id, "samtools": samtools_metrics}
 
     # Process all mosdepth CSV files
-    for filename in os.listdir(mosdepth_dir):
+    for filename in sorted(os.listdir(mosdepth_dir)):
         if filename.endswith(".csv"):  # Assuming mosdepth output is .csv
+            base_filename = filename.replace(".mosdepth.csv", "")  # Remove the suffix to get the base filename
+            if not in_shard(base_filename, shard):
+                continue
             filepath = os.path.join(mosdepth_dir, filename)
             mosdepth_metrics = parse_mosdepth_csv(filepath)
-            base_filename = filename.replace(".mosdepth.csv", "")  # Remove the suffix to get the base filename
             hg_id = extract_hg_id(base_filename)  # Extract HG ID for sorting
             ref_id = extract_ref_id(base_filename)  # Extract ref ID
             if hg_id:
@@ -76,20 +221,39 @@ def process_files_in_directory(samtools_dir, mosdepth_dir):
                     all_metrics[base_filename] = {"HG_ID": hg_id, "ref_id": ref_id, "mosdepth": mosdepth_metrics}
 
     # Sort all_metrics by HG_ID
-    sorted_metrics = dict(sorted(all_metrics.items(), key=lambda item: item[1]["HG_ID"]))
+    sorted_metrics = sort_metrics(all_metrics)
     
     return sorted_metrics
 
 def main():
+    parser = argparse.ArgumentParser(description="Extract samtools stats and mosdepth metrics into metrics.json.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--shard", type=parse_shard, help="Only process shard i/N (0-based) and write a partial metrics.shard-i-of-N.jsonl")
+    mode.add_argument("--merge", nargs="+", metavar="SHARD", help="Merge a complete set of shard JSONL files into metrics.json")
+    args = parser.parse_args()
+
     # Directories containing samtools and mosdepth files
     samtools_stats_dir = "/scratch2/Data_QC-stats_files/testing/QC_stats/"  # Replace with actual directory
     mosdepth_csv_dir = "/scratch2/Data_QC-stats_files/testing/QC_stats/" # Replace with actual directory
 
-    # Extract and merge metrics from samtools and mosdepth files
-    sorted_metrics = process_files_in_directory(samtools_stats_dir, mosdepth_csv_dir)
-
     # Output JSON file
     json_output = "metrics.json"
+
+    if args.merge:
+        write_to_json(merge_shards(args.merge), json_output)
+        print(f"Merged {len(args.merge)} shards into {json_output}.")
+        return
+
+    shard = args.shard
+
+    # Extract and merge metrics from samtools and mosdepth files
+    sorted_metrics = process_files_in_directory(samtools_stats_dir, mosdepth_csv_dir, shard)
+
+    if shard:
+        shard_output = f"metrics.shard-{shard[0]}-of-{shard[1]}.jsonl"
+        write_shard(sorted_metrics, shard_output, shard)
+        print(f"Metrics for shard {shard[0]}/{shard[1]} written to {shard_output}.")
+        return
     
     # Write the combined metrics to JSON
     write_to_json(sorted_metrics, json_output)